@@ -3,9 +3,12 @@ from tkinter import ttk, messagebox
 import sqlite3
 import pandas as pd
 from datetime import datetime, timedelta
-import matplotlib.pyplot as plt
+import matplotlib
+from matplotlib.figure import Figure
+from matplotlib.patches import Patch
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 import threading
+import queue
 
 """
 tkinter/ttk: GUI elements and themed widgets
@@ -14,25 +17,87 @@ pandas: Could be used later for data processing (though not shown in this snippe
 datetime: Time-based formatting and calculations
 matplotlib: For charts (trends and historical visualizations)
 threading: Used to avoid freezing the GUI during data refresh
+queue: Hands chart data prepared by the refresh thread to the GUI thread
 """
 
+# Temperature bands for the current-temperature label colour
+HOT_THRESHOLD_C = 30.0
+COLD_THRESHOLD_C = 10.0
+
+# Values used for optional processed_weather_data columns that are NULL or
+# missing, applied once when the row is read so consumers can subscript directly
+WEATHER_DATA_DEFAULTS = {
+    'temperature': 0,
+    'wind_speed': 0,
+    'pressure': 1013,
+    'weather_severity': 0,
+    'comfort_index': 0,
+    'heat_index_c': 0,
+    'wind_chill_c': 0,
+}
+
+def weather_data_from_row(row):
+    """Convert a sqlite3.Row to a dict, using WEATHER_DATA_DEFAULTS for NULL or missing values."""
+    data = dict(WEATHER_DATA_DEFAULTS)
+    for key, value in zip(row.keys(), row):
+        if value is not None or key not in data:
+            data[key] = value
+    return data
+
 class WeatherApp:
     """
     Main weather application with modular UI components.
     """
     
+    # Format of processed_weather_data.timestamp. Time-window queries compare the
+    # stored text directly (so idx_city_ts can be used), which only orders correctly
+    # when their bounds are formatted exactly like the stored values.
+    TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+    
     def __init__(self, database_path: str):
         self.database_path = database_path
         self.root = tk.Tk()
         self.root.title("Weather Dashboard")
         self.root.geometry("1200x800")
         self.root.minsize(800, 600)
+        self.check_toolkit_versions()
         
         # Application state
         self.current_city = None
+        self.current_city_parts = ('', '')  # (city, country) for current_city
+        self._cities = []  # (city, country) pairs, loaded once by get_available_cities
         self.current_data = None
         self.refresh_interval = 30000  # 30 seconds
         
+        # Chart data fetched by the refresh thread, drawn on the Tk thread
+        self._render_queue = queue.Queue()
+        self._render_lock = threading.Lock()
+        self._refresh_pending = None  # historical_only flag of a refresh requested while loading
+        
+        # Newest timestamp already displayed, per (city, country)
+        self._last_seen_ts = {}
+        self._hist_dirty = False  # historical chart skipped while its tab was hidden
+        
+        # Persistent database connection, shared with the refresh worker thread
+        self.db = sqlite3.connect(database_path, check_same_thread=False, isolation_level=None)
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute("PRAGMA temp_store=MEMORY")
+        self.db.execute("PRAGMA cache_size=-65536")  # 64 MB page cache
+        self.db.execute("PRAGMA mmap_size=268435456")  # read-mostly: memory-map up to 256 MB
+        self.db.row_factory = sqlite3.Row
+        self._db_lock = threading.Lock()
+        
+        # WAL mode and the index are stored in the database file itself, so only
+        # set them up on a database that already holds the weather data
+        if self.has_weather_schema():
+            self.db.execute("PRAGMA journal_mode=WAL")
+            self.create_indexes()
+        
+        # Tk variables bound to the data display widgets, keyed by display name
+        self.display_vars = {}
+        self._temp_style = None  # style currently applied to temp_label
+        self._post_update_hooks = []  # callables run with each new data dict after the UI update
+        
         # Initialize UI components
         self.setup_styles()
         self.create_main_layout()
@@ -40,9 +105,40 @@ class WeatherApp:
         # self.load_initial_data()
         # self.start_auto_refresh()
     
+    def check_toolkit_versions(self):
+        """Warn when Tk or Matplotlib predate the fast TkAgg blit path."""
+        tk_version = self.root.tk.call('info', 'patchlevel')
+        if tuple(int(part) for part in tk_version.split('.')[:2]) < (8, 5):
+            print(f"Warning: Tk {tk_version} is older than 8.5; chart updates will be slow")
+        
+        # Matplotlib 3.5 blits through Tk_PhotoPutBlock and releases the GIL
+        mpl_version = matplotlib.__version__
+        if tuple(int(part) for part in mpl_version.split('.')[:2]) < (3, 5):
+            print(f"Warning: Matplotlib {mpl_version} is older than 3.5; chart updates will be slow")
+    
+    def has_weather_schema(self):
+        """Whether the database contains the processed_weather_data table."""
+        with self._db_lock:
+            row = self.db.execute("""
+                SELECT 1 FROM sqlite_master
+                WHERE type = 'table' AND name = 'processed_weather_data'
+            """).fetchone()
+        return row is not None
+    
+    def create_indexes(self):
+        """Create the index backing the per-city time-range queries."""
+        try:
+            with self._db_lock:
+                self.db.execute("""
+                    CREATE INDEX IF NOT EXISTS idx_city_ts
+                    ON processed_weather_data(city, country, timestamp)
+                """)
+        except sqlite3.Error as e:
+            print(f"Database error: {e}")
+    
     def setup_styles(self):
         """Configure application-wide styles and themes."""
-        style = ttk.Style()
+        self.style = style = ttk.Style()
         style.theme_use('clam')  # Modern looking theme
         
         # Define custom styles
@@ -108,11 +204,13 @@ class WeatherApp:
         current_frame.columnconfigure(0, weight=1)
         
         # Current temperature (large display)
-        self.temp_label = ttk.Label(current_frame, text="--°C", style='Large.TLabel')
+        self.temp_label = ttk.Label(current_frame, textvariable=self.create_display_var('temp', "--°C"),
+                                    style='Large.TLabel')
         self.temp_label.grid(row=0, column=0, pady=(0, 10))
         
         # Weather description
-        self.desc_label = ttk.Label(current_frame, text="Loading...", style='Heading.TLabel')
+        self.desc_label = ttk.Label(current_frame, textvariable=self.create_display_var('desc', "Loading..."),
+                                    style='Heading.TLabel')
         self.desc_label.grid(row=1, column=0, pady=(0, 15))
         
         # Key metrics in a grid
@@ -131,10 +229,12 @@ class WeatherApp:
         comfort_frame.grid(row=3, column=0, pady=(15, 0), sticky=(tk.W, tk.E))
         
         ttk.Label(comfort_frame, text="Comfort Index:", style='Heading.TLabel').grid(row=0, column=0)
-        self.comfort_label = ttk.Label(comfort_frame, text="--", style='Data.TLabel')
+        self.comfort_label = ttk.Label(comfort_frame, textvariable=self.create_display_var('comfort', "--"),
+                                       style='Data.TLabel')
         self.comfort_label.grid(row=0, column=1, padx=(10, 0))
         
-        self.comfort_bar = ttk.Progressbar(comfort_frame, length=200, mode='determinate')
+        self.comfort_bar = ttk.Progressbar(comfort_frame, length=200, mode='determinate',
+                                           variable=self.create_display_var('comfort_bar', 0, tk.DoubleVar))
         self.comfort_bar.grid(row=1, column=0, columnspan=2, pady=(5, 0), sticky=(tk.W, tk.E))
     
     def create_metric_display(self, parent, label_text, data_key, row, col, unit):
@@ -144,12 +244,19 @@ class WeatherApp:
         
         ttk.Label(frame, text=f"{label_text}:", style='Data.TLabel').grid(row=0, column=0, sticky=tk.W)
         
-        value_label = ttk.Label(frame, text=f"-- {unit}", style='Data.TLabel')
+        value_label = ttk.Label(frame, textvariable=self.create_display_var(data_key, f"-- {unit}"),
+                                style='Data.TLabel')
         value_label.grid(row=1, column=0, sticky=tk.W)
         
         # Store reference for updates
         setattr(self, f"{data_key}_label", value_label)
     
+    def create_display_var(self, key, initial, var_type=tk.StringVar):
+        """Create a Tk variable for a data display widget and register it under key."""
+        var = var_type(value=initial)
+        self.display_vars[key] = var
+        return var
+    
     def create_details_section(self, parent):
         """Create the detailed information and visualization section."""
         details_frame = ttk.LabelFrame(parent, text="Details & Trends", padding="10")
@@ -160,6 +267,7 @@ class WeatherApp:
         # Create notebook for tabbed content
         self.notebook = ttk.Notebook(details_frame)
         self.notebook.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+        # self.notebook.bind('<<NotebookTabChanged>>', self.on_tab_changed)
         
         # Recent trends tab
         self.create_trends_tab()
@@ -176,17 +284,54 @@ class WeatherApp:
         self.notebook.add(trends_frame, text="Recent Trends")
         
         # Matplotlib figure for trends
-        self.trends_fig, self.trends_ax = plt.subplots(figsize=(6, 4))
+        self.trends_fig = Figure(figsize=(6, 4), constrained_layout=True)
+        self.trends_ax = self.trends_fig.add_subplot(111)
+        humidity_ax = self.trends_ax.twinx()
+        
+        # Lines are created once and only their data changes on refresh. They
+        # are animated so the cached background is drawn without them.
+        self.trends_temp_line, = self.trends_ax.plot([], [], 'r-', label='Temperature (°C)',
+                                                     linewidth=2, animated=True)
+        self.trends_hum_line, = humidity_ax.plot([], [], 'b-', label='Humidity (%)',
+                                                 linewidth=2, animated=True)
+        
+        self.trends_ax.xaxis_date()
+        self.trends_ax.set_xlabel('Time')
+        self.trends_ax.tick_params(axis='x', labelrotation=45)
+        self.trends_ax.set_ylim(-10, 40)
+        self.trends_ax.set_ylabel('Temperature (°C)', color='r')
+        self.trends_ax.tick_params(axis='y', labelcolor='r')
+        humidity_ax.set_ylim(0, 100)
+        humidity_ax.set_ylabel('Humidity (%)', color='b')
+        humidity_ax.tick_params(axis='y', labelcolor='b')
+        self.trends_ax.legend(handles=[self.trends_temp_line, self.trends_hum_line], loc='upper left')
+        self.trends_title = self.trends_ax.set_title('')
+        
         self.trends_canvas = FigureCanvasTkAgg(self.trends_fig, trends_frame)
         self.trends_canvas.get_tk_widget().grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
         
+        # Every full draw (including resizes) re-caches the background for blitting
+        self.trends_bg = None
+        self.trends_canvas.mpl_connect('draw_event', self._on_trends_draw)
+        
         trends_frame.columnconfigure(0, weight=1)
         trends_frame.rowconfigure(0, weight=1)
     
+    def _on_trends_draw(self, event):
+        """Cache the static trends background after a full canvas draw."""
+        self.trends_bg = self.trends_canvas.copy_from_bbox(self.trends_fig.bbox)
+        self._draw_trends_lines()
+    
+    def _draw_trends_lines(self):
+        """Draw the animated trend lines onto the canvas buffer."""
+        self.trends_temp_line.axes.draw_artist(self.trends_temp_line)
+        self.trends_hum_line.axes.draw_artist(self.trends_hum_line)
+    
     def create_historical_tab(self):
         """Create the historical data tab."""
         historical_frame = ttk.Frame(self.notebook)
         self.notebook.add(historical_frame, text="Historical")
+        self.historical_tab = historical_frame
         
         # Time period selection
         period_frame = ttk.Frame(historical_frame)
@@ -202,7 +347,20 @@ class WeatherApp:
         # period_combo.bind('<<ComboboxSelected>>', self.on_period_changed)
         
         # Historical chart
-        self.hist_fig, self.hist_ax = plt.subplots(figsize=(6, 4))
+        self.hist_fig = Figure(figsize=(6, 4), constrained_layout=True)
+        self.hist_ax = self.hist_fig.add_subplot(111)
+        
+        # Labels, legend and grid are set up once; refreshes only replace the data
+        self.hist_line, = self.hist_ax.plot([], [], 'g-', label='Average Temperature', linewidth=2)
+        self.hist_band = None  # min/max fill, replaced on each refresh
+        self.hist_ax.xaxis_date()
+        self.hist_ax.set_xlabel('Date/Time')
+        self.hist_ax.set_ylabel('Temperature (°C)')
+        self.hist_ax.tick_params(axis='x', labelrotation=45)
+        self.hist_title = self.hist_ax.set_title('Historical Data')
+        self.hist_ax.legend(handles=[self.hist_line, Patch(color='green', alpha=0.3, label='24h Range')])
+        self.hist_ax.grid(True, alpha=0.3)
+        
         self.hist_canvas = FigureCanvasTkAgg(self.hist_fig, historical_frame)
         self.hist_canvas.get_tk_widget().grid(row=1, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
         
@@ -242,23 +400,28 @@ class WeatherApp:
         derived_frame = ttk.LabelFrame(parent, text="Derived Metrics", padding="10")
         derived_frame.grid(row=0, column=0, sticky=(tk.W, tk.E), pady=(0, 10))
         
-        self.heat_index_label = ttk.Label(derived_frame, text="Heat Index: --°C")
+        self.heat_index_label = ttk.Label(derived_frame,
+                                          textvariable=self.create_display_var('heat_index', "Heat Index: --°C"))
         self.heat_index_label.grid(row=0, column=0, sticky=tk.W)
         
-        self.wind_chill_label = ttk.Label(derived_frame, text="Wind Chill: --°C")
+        self.wind_chill_label = ttk.Label(derived_frame,
+                                          textvariable=self.create_display_var('wind_chill', "Wind Chill: --°C"))
         self.wind_chill_label.grid(row=1, column=0, sticky=tk.W)
         
-        self.severity_label = ttk.Label(derived_frame, text="Weather Severity: --")
+        self.severity_label = ttk.Label(derived_frame,
+                                        textvariable=self.create_display_var('severity', "Weather Severity: --"))
         self.severity_label.grid(row=2, column=0, sticky=tk.W)
         
         # Time-based information
         time_frame = ttk.LabelFrame(parent, text="Time Information", padding="10")
         time_frame.grid(row=1, column=0, sticky=(tk.W, tk.E), pady=(0, 10))
         
-        self.last_update_label = ttk.Label(time_frame, text="Last Update: --")
+        self.last_update_label = ttk.Label(time_frame,
+                                           textvariable=self.create_display_var('last_update', "Last Update: --"))
         self.last_update_label.grid(row=0, column=0, sticky=tk.W)
         
-        self.local_time_label = ttk.Label(time_frame, text="Local Time: --")
+        self.local_time_label = ttk.Label(time_frame,
+                                          textvariable=self.create_display_var('local_time', "Local Time: --"))
         self.local_time_label.grid(row=1, column=0, sticky=tk.W)
     
     def create_status_section(self, parent):
@@ -304,126 +467,287 @@ class WeatherApp:
     def load_initial_data(self):
         """Load initial data and populate the interface."""
         try:
-            # Load available cities
+            # The combobox selection indexes into the cached city list
             cities = self.get_available_cities()
-            self.city_combo['values'] = cities
+            self.city_combo['values'] = [f"{city}, {country}" for city, country in cities]
             if cities:
-                self.city_combo.set(cities[0])
-                self.current_city = cities[0]
+                self.city_combo.current(0)
+                self.select_city(0)
                 self.refresh_data()
             
         except Exception as e:
             self.show_error(f"Failed to load initial data: {e}")
 
     def get_available_cities(self):
-        """Get list of cities with available data."""
+        """Get list of (city, country) pairs with available data, cached in _cities."""
+        if self._cities:
+            return self._cities
+        
         try:
-            conn = sqlite3.connect(self.database_path)
-            cursor = conn.execute("""
-                SELECT DISTINCT city || ', ' || country as city_country
-                FROM weather_readings 
-                ORDER BY city
-            """)
-            cities = [row[0] for row in cursor.fetchall()]
-            conn.close()
-            return cities
+            with self._db_lock:
+                cursor = self.db.execute("""
+                    SELECT DISTINCT city, country
+                    FROM weather_readings 
+                    ORDER BY city
+                """)
+                self._cities = [tuple(row) for row in cursor.fetchall()]
+            return self._cities
         except sqlite3.Error as e:
             self.show_error(f"Database error: {e}")
             return []
 
-    def refresh_data(self):
-        """Refresh all data displays."""
+    def invalidate_cities_cache(self):
+        """Re-read the city list after readings for new cities were written, and
+        update the city selector to match so its indexes stay valid (Tk thread only)."""
+        previous = self._cities
+        self._cities = []
+        cities = self.get_available_cities()
+        if not cities:
+            # Keep the list the selector was built from
+            self._cities = previous
+            return
+        
+        self.city_combo['values'] = [f"{city}, {country}" for city, country in cities]
+        if self.current_city_parts in cities:
+            self.city_combo.current(cities.index(self.current_city_parts))
+
+    def select_city(self, index):
+        """Make the city at the given index of the loaded city list current."""
+        city, country = self._cities[index]
+        self.current_city = f"{city}, {country}"
+        self.current_city_parts = (city, country)
+
+    def refresh_data(self, historical_only=False):
+        """Refresh all data displays, or only the historical chart after a period or tab change."""
         if not self.current_city:
             return
         
-        self.update_status("Refreshing data...")
+        if historical_only and self.notebook.select() != str(self.historical_tab):
+            # Tab hidden again before this ran; on_tab_changed reloads it
+            self._hist_dirty = True
+            return
         
-        # Run data loading in background thread to prevent UI freezing
-        threading.Thread(target=self._load_data_background, daemon=True).start()
+        # Run this refresh once the one still loading has finished;
+        # a full refresh also covers a historical-only one
+        if not self._render_lock.acquire(blocking=False):
+            if self._refresh_pending is None or not historical_only:
+                self._refresh_pending = historical_only
+            return
+        
+        try:
+            self.update_status("Refreshing data...")
+            
+            # The historical chart is only refreshed while its tab is showing.
+            # Its size is read here because the worker must not touch Tk widgets.
+            if self.notebook.select() == str(self.historical_tab):
+                period = self.period_var.get()
+                max_points = self.hist_max_points()
+            else:
+                period = max_points = None
+            
+            # Run data loading in background thread to prevent UI freezing
+            threading.Thread(target=self._load_data_background,
+                             args=(self.current_city_parts, period, max_points, historical_only),
+                             daemon=True).start()
+        except Exception:
+            # The worker never started, so it will not release the lock
+            self._render_lock.release()
+            raise
 
-    def _load_data_background(self):
-        """Load data in background thread."""
+    def _load_data_background(self, city_parts, period, max_points, historical_only):
+        """Load data in background thread. period is None while the historical tab is hidden."""
         try:
-            # Parse city and country
-            city_parts = self.current_city.split(', ')
-            city, country = city_parts[0], city_parts[1] if len(city_parts) > 1 else ''
+            city, country = city_parts
+            
+            if historical_only:
+                # Period or tab change: only the historical chart needs new data
+                historical_data = self._fetch_historical_data(city, country, period, max_points)
+                if historical_data is not None:
+                    self._render_queue.put((self._render_historical_chart, historical_data))
+                self.root.after(0, self._drain_render_queue)
+                return
+            
+            # Cheap indexed probe first: nothing to redraw if no new rows arrived
+            latest_ts = self.get_latest_timestamp(city, country)
+            if latest_ts is not None and latest_ts == self._last_seen_ts.get(city_parts):
+                self.root.after(0, self.update_status, "Up to date")
+                return
             
             # Load current weather data
             current_data = self.get_current_weather_data(city, country)
             
             if current_data:
-                # Update UI in main thread
-                self.root.after(0, self._update_ui_with_data, current_data)
+                # Query and convert the chart data here so the Tk thread only draws.
+                # Both queries share the connection lock, so they run one after the other.
+                trends_data = self._fetch_trends_data(city, country)
+                if trends_data is not None:
+                    self._render_queue.put((self._render_trends_chart, trends_data))
+                
+                if period is not None:
+                    historical_data = self._fetch_historical_data(city, country, period, max_points)
+                    if historical_data is not None:
+                        self._render_queue.put((self._render_historical_chart, historical_data))
+                
+                # Update UI in main thread with a single callback
+                self.root.after(0, self._apply_loaded_data, city_parts, latest_ts, current_data,
+                                self._build_display_updates(current_data), period is None)
             else:
                 self.root.after(0, self.update_status, "No data available for selected city")
                 
         except Exception as e:
             self.root.after(0, self.show_error, f"Error loading data: {e}")
+        finally:
+            self.root.after(0, self._finish_refresh)
+
+    def _finish_refresh(self):
+        """Allow the next refresh, and run one that was requested while loading (Tk thread)."""
+        self._render_lock.release()
+        pending, self._refresh_pending = self._refresh_pending, None
+        if pending is not None:
+            self.refresh_data(historical_only=pending)
+
+    def _apply_loaded_data(self, city_parts, latest_ts, data, updates, historical_skipped):
+        """Show data loaded for city_parts, unless another city was selected meanwhile."""
+        if city_parts != self.current_city_parts:
+            # The pending refresh loads the newly selected city
+            return
+        
+        self._last_seen_ts[city_parts] = latest_ts
+        if historical_skipped:
+            # Redrawn by on_tab_changed when the tab is next selected
+            self._hist_dirty = True
+        self._update_ui_with_data(data, updates)
+
+    def _build_display_updates(self, data):
+        """Format display values for data, keyed like display_vars. Needs no Tk calls."""
+        comfort = data['comfort_index']
+        return {
+            # Current weather display
+            'temp': f"{data['temperature']:.1f}°C",
+            'desc': data['weather_description'].title(),
+            
+            # Metric displays
+            'feels_like': f"{data['feels_like']:.1f}°C",
+            'humidity': f"{data['humidity']}%",
+            'pressure': f"{data['pressure']:.1f} hPa",
+            'wind_speed': f"{data['wind_speed']:.1f} m/s",
+            
+            # Comfort index
+            'comfort': f"{comfort:.0f}/100",
+            'comfort_bar': comfort,
+            
+            # Detailed metrics
+            'heat_index': f"Heat Index: {data['heat_index_c']:.1f}°C",
+            'wind_chill': f"Wind Chill: {data['wind_chill_c']:.1f}°C",
+            'severity': f"Weather Severity: {data['weather_severity']:.0f}/100",
+            
+            # Time information
+            'last_update': f"Last Update: {data['timestamp']}",
+            'local_time': f"Local Time: {datetime.now().strftime('%H:%M:%S')}",
+        }
 
-    def _update_ui_with_data(self, data):
+    def _update_ui_with_data(self, data, updates=None):
         """Update UI components with new data."""
         self.current_data = data
+        if updates is None:
+            updates = self._build_display_updates(data)
         
-        # Update current weather display
-        self.temp_label.config(text=f"{data['temperature']:.1f}°C")
-        self.desc_label.config(text=data['weather_description'].title())
-        
-        # Update metric displays
-        self.feels_like_label.config(text=f"{data['feels_like']:.1f}°C")
-        self.humidity_label.config(text=f"{data['humidity']}%")
-        self.pressure_label.config(text=f"{data['pressure']:.1f} hPa")
-        self.wind_speed_label.config(text=f"{data['wind_speed']:.1f} m/s")
-        
-        # Update comfort index
-        comfort = data.get('comfort_index', 0)
-        self.comfort_label.config(text=f"{comfort:.0f}/100")
-        self.comfort_bar['value'] = comfort
-        
-        # Update detailed metrics
-        self.heat_index_label.config(text=f"Heat Index: {data.get('heat_index_c', 0):.1f}°C")
-        self.wind_chill_label.config(text=f"Wind Chill: {data.get('wind_chill_c', 0):.1f}°C")
-        self.severity_label.config(text=f"Weather Severity: {data.get('weather_severity', 0):.0f}/100")
-        
-        # Update time information
-        self.last_update_label.config(text=f"Last Update: {data['timestamp']}")
-        self.local_time_label.config(text=f"Local Time: {datetime.now().strftime('%H:%M:%S')}")
+        # One variable write per display widget
+        for key, value in updates.items():
+            self.display_vars[key].set(value)
         
         # Update temperature color based on value
-        temp = data['temperature']
-        if temp > 30:
-            self.temp_label.config(style='Hot.TLabel')
-        elif temp < 10:
-            self.temp_label.config(style='Cold.TLabel')
+        temperature = data['temperature']
+        if temperature > HOT_THRESHOLD_C:
+            temp_style = 'Hot.TLabel'
+        elif temperature < COLD_THRESHOLD_C:
+            temp_style = 'Cold.TLabel'
         else:
-            self.temp_label.config(style='Normal.TLabel')
+            temp_style = 'Normal.TLabel'
+        if temp_style != self._temp_style:
+            self.temp_label.configure(style=temp_style)
+            self._temp_style = temp_style
+        
+        # Update visualizations with chart data prepared by the refresh thread
+        self._drain_render_queue()
         
-        # Update visualizations
-        # self.update_trends_chart()
-        # self.update_historical_chart()
+        for hook in self._post_update_hooks:
+            hook(data)
         
         # self.update_status("Data updated successfully")
 
+    def _drain_render_queue(self):
+        """Draw every chart payload queued by the refresh thread (Tk thread only)."""
+        while True:
+            try:
+                render, chart_data = self._render_queue.get_nowait()
+            except queue.Empty:
+                break
+            render(chart_data)
+
     def get_current_weather_data(self, city, country):
         """Get the most recent weather data for a city."""
         try:
-            conn = sqlite3.connect(self.database_path)
-            cursor = conn.execute("""
-                SELECT * FROM processed_weather_data
-                WHERE city = ? AND country = ?
-                ORDER BY timestamp DESC
-                LIMIT 1
-            """, (city, country))
+            with self._db_lock:
+                cursor = self.db.execute("""
+                    SELECT * FROM processed_weather_data
+                    WHERE city = ? AND country = ?
+                    ORDER BY timestamp DESC
+                    LIMIT 1
+                """, (city, country))
+                row = cursor.fetchone()
             
-            row = cursor.fetchone()
             if row:
-                # Convert to dictionary (assuming processed_weather_data has all columns)
-                columns = [description[0] for description in cursor.description]
-                data = dict(zip(columns, row))
-                conn.close()
-                return data
+                return weather_data_from_row(row)
+            
+            return None
             
-            conn.close()
+        except sqlite3.Error as e:
+            print(f"Database error: {e}")
             return None
+
+    def get_latest_weather_data(self, cities):
+        """Get the most recent weather data for several (city, country) pairs in one query."""
+        if not cities:
+            return {}
+        
+        placeholders = ', '.join(['(?, ?)'] * len(cities))
+        params = [value for city_country in cities for value in city_country]
+        
+        try:
+            with self._db_lock:
+                cursor = self.db.execute(f"""
+                    WITH ranked AS (
+                        SELECT *, ROW_NUMBER() OVER (
+                            PARTITION BY city, country ORDER BY timestamp DESC
+                        ) AS rn
+                        FROM processed_weather_data
+                        WHERE (city, country) IN (VALUES {placeholders})
+                    )
+                    SELECT * FROM ranked WHERE rn = 1
+                """, params)
+                rows = cursor.fetchall()
+            
+            latest = {}
+            for row in rows:
+                data = weather_data_from_row(row)
+                del data['rn']
+                latest[(data['city'], data['country'])] = data
+            return latest
+            
+        except sqlite3.Error as e:
+            print(f"Database error: {e}")
+            return {}
+
+    def get_latest_timestamp(self, city, country):
+        """Get the timestamp of the newest stored reading for a city."""
+        try:
+            with self._db_lock:
+                row = self.db.execute("""
+                    SELECT MAX(timestamp) FROM processed_weather_data
+                    WHERE city = ? AND country = ?
+                """, (city, country)).fetchone()
+            return row[0]
             
         except sqlite3.Error as e:
             print(f"Database error: {e}")
@@ -442,7 +766,7 @@ if __name__ == "__main__":
         'heat_index_c': 23.0,
         'wind_chill_c': 20.0,
         'weather_severity': 15,
-        'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        'timestamp': datetime.now().strftime(WeatherApp.TIMESTAMP_FORMAT)
     }
     app._update_ui_with_data(dummy_data)
     app.root.mainloop()
\ No newline at end of file
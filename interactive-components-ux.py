@@ -1,130 +1,212 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
 import sqlite3
-import pandas as pd
+import numpy as np
 from datetime import datetime, timedelta
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkinter
+import matplotlib.dates as mdates
+from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 import threading
 
+TRENDS_QUERY = """
+    SELECT timestamp, temperature, humidity
+    FROM processed_weather_data
+    WHERE city = ? AND country = ? AND timestamp > ?
+    ORDER BY timestamp
+"""
+
+# Historical chart periods: (time window, SQLite strftime bucket format)
+HISTORICAL_PERIODS = {
+    "24 hours": (timedelta(hours=24), '%Y-%m-%dT%H:00:00'),
+    "3 days": (timedelta(days=3), '%Y-%m-%dT%H:00:00'),
+    "7 days": (timedelta(days=7), '%Y-%m-%dT%H:00:00'),
+    "30 days": (timedelta(days=30), '%Y-%m-%dT00:00:00'),
+}
+
+# Aggregate in SQL so only one row per bucket reaches Python
+HISTORICAL_QUERY = """
+    SELECT strftime(?, timestamp) AS bucket,
+           AVG(temperature), MIN(temp_24h_min), MAX(temp_24h_max)
+    FROM processed_weather_data
+    WHERE city = ? AND country = ? AND timestamp > ?
+    GROUP BY bucket
+    ORDER BY bucket
+"""
+
+def lttb_indices(x, y, n_out):
+    """Indices of the points kept by Largest-Triangle-Three-Buckets downsampling."""
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    
+    # First and last points are always kept; the rest is split into n_out - 2 buckets
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.intp)
+    keep = np.empty(n_out, dtype=np.intp)
+    keep[0], keep[-1] = 0, n - 1
+    
+    selected = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        next_start, next_end = (edges[i + 1], edges[i + 2]) if i + 2 < len(edges) else (n - 1, n)
+        next_x, next_y = x[next_start:next_end].mean(), y[next_start:next_end].mean()
+        
+        # Keep the point forming the largest triangle with the previous pick
+        # and the average of the next bucket
+        area = np.abs((x[selected] - next_x) * (y[start:end] - y[selected])
+                      - (x[selected] - x[start:end]) * (next_y - y[selected]))
+        selected = start + int(np.argmax(area))
+        keep[i + 1] = selected
+    
+    return keep
+
+def _tuple_cursor(self):
+    """Cursor returning plain tuples, for bulk reads that are unpacked positionally."""
+    cursor = self.db.cursor()
+    cursor.row_factory = None
+    return cursor
+
 def update_trends_chart(self):
     """Update the trends chart with recent data."""
     if not self.current_city:
         return
     
     try:
-        # Get recent data for trends
-        city_parts = self.current_city.split(', ')
-        city, country = city_parts[0], city_parts[1] if len(city_parts) > 1 else ''
-        
-        # Load last 24 hours of data
-        end_time = datetime.now()
-        start_time = end_time - timedelta(hours=24)
-        
-        conn = sqlite3.connect(self.database_path)
-        df = pd.read_sql_query("""
-            SELECT timestamp, temperature, humidity, comfort_index
-            FROM processed_weather_data
-            WHERE city = ? AND country = ?
-            AND datetime(timestamp) > datetime(?)
-            ORDER BY timestamp
-        """, conn, params=(city, country, start_time.isoformat()))
-        conn.close()
-        
-        if df.empty:
-            return
-        
-        # Clear previous plot
-        self.trends_ax.clear()
-        
-        # Convert timestamp to datetime
-        df['timestamp'] = pd.to_datetime(df['timestamp'])
-        
-        # Create subplots for multiple metrics
+        city, country = self.current_city_parts
+        trends_data = self._fetch_trends_data(city, country)
+    except Exception as e:
+        print(f"Error updating trends chart: {e}")
+        return
+    
+    if trends_data is not None:
+        self._render_trends_chart(trends_data)
+
+def _fetch_trends_data(self, city, country):
+    """Load the last 24 hours of trend data as arrays. Safe to call off the Tk thread."""
+    end_time = datetime.now()
+    start_time = end_time - timedelta(hours=24)
+    since = start_time.strftime(self.TIMESTAMP_FORMAT)
+    
+    with self._db_lock:
+        cursor = self._tuple_cursor()
+        rows = cursor.execute(TRENDS_QUERY, (city, country, since)).fetchall()
+    
+    if not rows:
+        return None
+    
+    timestamps, temps, humidity = zip(*rows)
+    return (f"{city}, {country}", end_time,
+            np.array(timestamps, dtype='datetime64[us]'),
+            np.array(temps, dtype=float),
+            np.array(humidity, dtype=float))
+
+def _render_trends_chart(self, trends_data):
+    """Draw prepared trend arrays on the trends chart (Tk thread only)."""
+    city_name, end_time, timestamps, temps, humidity = trends_data
+    if city_name != self.current_city:
+        return  # fetched before another city was selected
+    
+    try:
         ax1 = self.trends_ax
-        ax2 = ax1.twinx()
-        
-        # Plot temperature
-        line1 = ax1.plot(df['timestamp'], df['temperature'], 'r-', label='Temperature (°C)', linewidth=2)
-        ax1.set_ylabel('Temperature (°C)', color='r')
-        ax1.tick_params(axis='y', labelcolor='r')
-        
-        # Plot humidity on secondary axis
-        line2 = ax2.plot(df['timestamp'], df['humidity'], 'b-', label='Humidity (%)', linewidth=2)
-        ax2.set_ylabel('Humidity (%)', color='b')
-        ax2.tick_params(axis='y', labelcolor='b')
-        
-        # Format x-axis
-        ax1.set_xlabel('Time')
-        plt.setp(ax1.xaxis.get_majorticklabels(), rotation=45)
-        
-        # Add title
-        ax1.set_title(f'24-Hour Trends for {self.current_city}')
-        
-        # Add legend
-        lines1, labels1 = ax1.get_legend_handles_labels()
-        lines2, labels2 = ax2.get_legend_handles_labels()
-        ax1.legend(lines1 + lines2, labels1 + labels2, loc='upper left')
-        
-        # Improve layout
-        self.trends_fig.tight_layout()
-        self.trends_canvas.draw()
+        self.trends_temp_line.set_data(timestamps, temps)
+        self.trends_hum_line.set_data(timestamps, humidity)
+        
+        # The x window only advances once per hour, and the temperature axis is
+        # only refitted when the data leaves it, fills less than half of it or
+        # belongs to another city, so most refreshes keep the same view
+        window_end = end_time.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
+        xlim = (mdates.date2num(window_end - timedelta(hours=25)), mdates.date2num(window_end))
+        title = f'24-Hour Trends for {city_name}'
+        ymin, ymax = ax1.get_ylim()
+        low, high = np.nanmin(temps), np.nanmax(temps)
+        
+        refit_y = (self.trends_title.get_text() != title or low < ymin or high > ymax
+                   or (high - low + 4) < (ymax - ymin) / 2)
+        view_changed = tuple(ax1.get_xlim()) != xlim or refit_y
+        
+        if self.trends_bg is None or view_changed:
+            # View changed: full redraw, which also re-caches the background
+            ax1.set_xlim(xlim)
+            if refit_y:
+                ax1.set_ylim(low - 2, high + 2)
+            self.trends_title.set_text(title)
+            self.trends_canvas.draw()
+        else:
+            # Same view: restore the cached background and blit only the lines
+            self.trends_canvas.restore_region(self.trends_bg)
+            self._draw_trends_lines()
+            self.trends_canvas.blit(self.trends_fig.bbox)
         
     except Exception as e:
         print(f"Error updating trends chart: {e}")
 
 def update_historical_chart(self):
     """Update the historical chart based on selected period."""
+    if not self.current_city:
+        return
+    
     period = self.period_var.get()
     
-    # Convert period to timedelta
-    period_map = {
-        "24 hours": timedelta(hours=24),
-        "3 days": timedelta(days=3),
-        "7 days": timedelta(days=7),
-        "30 days": timedelta(days=30)
-    }
+    try:
+        city, country = self.current_city_parts
+        historical_data = self._fetch_historical_data(city, country, period, self.hist_max_points())
+    except Exception as e:
+        print(f"Error updating historical chart: {e}")
+        return
+    
+    if historical_data is not None:
+        self._render_historical_chart(historical_data)
+
+def hist_max_points(self):
+    """Most points worth plotting on the historical chart (Tk thread only)."""
+    # More than two points per horizontal pixel cannot be seen
+    return int(2 * self.hist_ax.bbox.width)
+
+def _fetch_historical_data(self, city, country, period, max_points):
+    """Load bucketed historical data as arrays, at most max_points of them.
+    Safe to call off the Tk thread."""
+    time_delta, bucket_format = HISTORICAL_PERIODS.get(period, HISTORICAL_PERIODS["7 days"])
     
-    time_delta = period_map.get(period, timedelta(days=7))
+    end_time = datetime.now()
+    start_time = end_time - time_delta
+    since = start_time.strftime(self.TIMESTAMP_FORMAT)
+    
+    with self._db_lock:
+        cursor = self._tuple_cursor()
+        rows = cursor.execute(HISTORICAL_QUERY, (bucket_format, city, country, since)).fetchall()
+    
+    if not rows:
+        return None
+    
+    buckets, temps, mins, maxs = zip(*rows)
+    timestamps = np.array(buckets, dtype='datetime64[s]')
+    temps = np.array(temps, dtype=float)
+    mins = np.array(mins, dtype=float)
+    maxs = np.array(maxs, dtype=float)
+    
+    # Hourly buckets keep this to 168 points at most, so LTTB only runs when
+    # the chart is narrower than that; it guards against finer bucket formats
+    if len(timestamps) > max_points:
+        keep = lttb_indices(timestamps.astype(np.int64).astype(float), temps, max_points)
+        timestamps, temps, mins, maxs = timestamps[keep], temps[keep], mins[keep], maxs[keep]
+    
+    return f"{city}, {country}", period, timestamps, temps, mins, maxs
+
+def _render_historical_chart(self, historical_data):
+    """Draw prepared historical arrays on the historical chart (Tk thread only)."""
+    city_name, period, timestamps, temps, mins, maxs = historical_data
+    if city_name != self.current_city:
+        return  # fetched before another city was selected
     
     try:
-        city_parts = self.current_city.split(', ')
-        city, country = city_parts[0], city_parts[1] if len(city_parts) > 1 else ''
-        
-        end_time = datetime.now()
-        start_time = end_time - time_delta
-        
-        conn = sqlite3.connect(self.database_path)
-        df = pd.read_sql_query("""
-            SELECT timestamp, temperature, temp_24h_max, temp_24h_min
-            FROM processed_weather_data
-            WHERE city = ? AND country = ?
-            AND datetime(timestamp) > datetime(?)
-            ORDER BY timestamp
-        """, conn, params=(city, country, start_time.isoformat()))
-        conn.close()
-        
-        if df.empty:
-            return
-        
-        self.hist_ax.clear()
-        df['timestamp'] = pd.to_datetime(df['timestamp'])
-        
-        # Plot temperature with min/max band
-        self.hist_ax.plot(df['timestamp'], df['temperature'], 'g-', label='Current Temperature', linewidth=2)
-        
-        if 'temp_24h_max' in df.columns and 'temp_24h_min' in df.columns:
-            self.hist_ax.fill_between(df['timestamp'], df['temp_24h_min'], df['temp_24h_max'], 
-                                    alpha=0.3, color='green', label='24h Range')
-        
-        self.hist_ax.set_xlabel('Date/Time')
-        self.hist_ax.set_ylabel('Temperature (°C)')
-        self.hist_ax.set_title(f'Historical Data - {period}')
-        self.hist_ax.legend()
-        self.hist_ax.grid(True, alpha=0.3)
-        
-        plt.setp(self.hist_ax.xaxis.get_majorticklabels(), rotation=45)
-        self.hist_fig.tight_layout()
+        self.hist_line.set_data(timestamps, temps)
+        self.hist_title.set_text(f'Historical Data - {period}')
+        
+        # Rescale to the new line, then swap in the new min/max band
+        if self.hist_band is not None:
+            self.hist_band.remove()
+        self.hist_ax.relim()
+        self.hist_band = self.hist_ax.fill_between(timestamps, mins, maxs, alpha=0.3, color='green')
+        self.hist_ax.autoscale_view()
+        
         self.hist_canvas.draw()
         
     except Exception as e:
@@ -133,12 +215,19 @@ def update_historical_chart(self):
 # Event Handlers
 def on_city_changed(self, event):
     """Handle city selection change."""
-    self.current_city = self.city_var.get()
+    self.select_city(self.city_combo.current())
+    self._last_seen_ts.clear()
     self.refresh_data()
 
 def on_period_changed(self, event):
     """Handle period selection change for historical chart."""
-    self.update_historical_chart()
+    self.refresh_data(historical_only=True)
+
+def on_tab_changed(self, event):
+    """Redraw the historical chart if refreshes skipped it while its tab was hidden."""
+    if self._hist_dirty and self.notebook.select() == str(self.historical_tab):
+        self._hist_dirty = False
+        self.refresh_data(historical_only=True)
 
 def toggle_fullscreen(self):
     """Toggle fullscreen mode."""
@@ -151,7 +240,9 @@ def open_preferences(self):
 
 def start_auto_refresh(self):
     """Start automatic data refresh."""
-    self.refresh_data()
+    # Nothing is visible while minimized or hidden, so skip the refresh work
+    if self.root.state() not in ('iconic', 'withdrawn'):
+        self.refresh_data()
     self.root.after(self.refresh_interval, self.start_auto_refresh)
 
 def update_status(self, message):
@@ -165,7 +256,10 @@ def show_error(self, message):
 
 def run(self):
     """Start the application main loop."""
-    self.root.mainloop()
+    try:
+        self.root.mainloop()
+    finally:
+        self.db.close()
 
 # ----------------------------------------------------------------------------------
 
@@ -235,8 +329,7 @@ class PreferencesDialog:
             self.app.refresh_interval = new_interval
             
             # Update theme
-            style = ttk.Style()
-            style.theme_use(self.theme_var.get())
+            self.app.style.theme_use(self.theme_var.get())
             
             self.dialog.destroy()
             
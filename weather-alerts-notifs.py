@@ -1,12 +1,46 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
 import sqlite3
-import pandas as pd
+import csv
 from datetime import datetime, timedelta
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkinter
 import threading
+import operator
 
+# Rows fetched per export page
+EXPORT_PAGE_SIZE = 1000
+
+# Fixed statement text so every page reuses SQLite's cached statement.
+# rowid breaks ties between equal timestamps so a page boundary never skips rows.
+EXPORT_QUERY = """
+    SELECT rowid, * FROM processed_weather_data
+    WHERE city = ? AND country = ? AND (timestamp, rowid) > (?, ?)
+    ORDER BY timestamp, rowid
+    LIMIT ?
+"""
+
+# Text colour for each alert severity level
+SEVERITY_COLORS = {
+    'warning': 'red',
+    'caution': 'orange',
+    'watch': 'yellow'
+}
+
+# Alert rules: (threshold name, data key, comparison, message format, alert fields)
+ALERT_RULES = (
+    ('high_temperature', 'temperature', operator.gt, 'Temperature is very high: %.1f°C',
+     {'type': 'temperature', 'severity': 'warning', 'title': 'High Temperature Alert', 'icon': '🔥'}),
+    ('low_temperature', 'temperature', operator.lt, 'Temperature is very low: %.1f°C',
+     {'type': 'temperature', 'severity': 'warning', 'title': 'Low Temperature Alert', 'icon': '🥶'}),
+    ('high_wind_speed', 'wind_speed', operator.gt, 'Strong winds detected: %.1f m/s',
+     {'type': 'wind', 'severity': 'caution', 'title': 'High Wind Alert', 'icon': '💨'}),
+    ('low_pressure', 'pressure', operator.lt, 'Low pressure system detected: %.1f hPa',
+     {'type': 'pressure', 'severity': 'watch', 'title': 'Low Pressure Alert', 'icon': '⛈️'}),
+    ('high_severity', 'weather_severity', operator.gt, 'High weather severity index: %.0f/100',
+     {'type': 'severity', 'severity': 'warning', 'title': 'Severe Weather Alert', 'icon': '⚠️'}),
+)
+
+# Status bar text by active alert count; each rule fires at most once per check
+ALERT_STATUS_TEXT = tuple(f"⚠️ {count} weather alert(s) active" for count in range(len(ALERT_RULES) + 1))
 
 
 
@@ -23,82 +57,106 @@ class WeatherAlertsManager:
             'high_severity': 70.0
         }
         self.active_alerts = []
+        self._last_key = None  # readings behind active_alerts
+        self._alerts_window = None  # built on first display, then reused
+        self._alert_rows = []
+        self.build_alert_rules()
+    
+    def build_alert_rules(self):
+        """Resolve ALERT_RULES against alert_thresholds. Call again after changing thresholds."""
+        self._rules = tuple(
+            (key, compare, self.alert_thresholds[threshold_name], message_format,
+             {**template, 'severity_text': f"Severity: {template['severity'].upper()}"})
+            for threshold_name, key, compare, message_format, template in ALERT_RULES
+        )
+        # Cached results were computed with the old thresholds
+        self._last_key = None
     
     def check_weather_alerts(self, weather_data):
         """Check for weather conditions that warrant alerts."""
-        new_alerts = []
-        
-        # Temperature alerts
-        temp = weather_data.get('temperature', 0)
-        if temp > self.alert_thresholds['high_temperature']:
-            new_alerts.append({
-                'type': 'temperature',
-                'severity': 'warning',
-                'title': 'High Temperature Alert',
-                'message': f'Temperature is very high: {temp:.1f}°C',
-                'icon': '🔥'
-            })
-        elif temp < self.alert_thresholds['low_temperature']:
-            new_alerts.append({
-                'type': 'temperature',
-                'severity': 'warning',
-                'title': 'Low Temperature Alert',
-                'message': f'Temperature is very low: {temp:.1f}°C',
-                'icon': '🥶'
-            })
-        
-        # Wind speed alerts
-        wind_speed = weather_data.get('wind_speed', 0)
-        if wind_speed > self.alert_thresholds['high_wind_speed']:
-            new_alerts.append({
-                'type': 'wind',
-                'severity': 'caution',
-                'title': 'High Wind Alert',
-                'message': f'Strong winds detected: {wind_speed:.1f} m/s',
-                'icon': '💨'
-            })
+        # Unchanged readings give the same alerts as last time. Raw values are
+        # compared because rounding could hide a reading crossing a threshold.
+        key = (weather_data['temperature'],
+               weather_data['wind_speed'],
+               weather_data['pressure'],
+               weather_data['weather_severity'])
+        if key == self._last_key:
+            return self.active_alerts
+        self._last_key = key
         
-        # Pressure alerts (potential storms)
-        pressure = weather_data.get('pressure', 1013)
-        if pressure < self.alert_thresholds['low_pressure']:
-            new_alerts.append({
-                'type': 'pressure',
-                'severity': 'watch',
-                'title': 'Low Pressure Alert',
-                'message': f'Low pressure system detected: {pressure:.1f} hPa',
-                'icon': '⛈️'
-            })
+        new_alerts = []
         
-        # Weather severity alerts
-        severity = weather_data.get('weather_severity', 0)
-        if severity > self.alert_thresholds['high_severity']:
-            new_alerts.append({
-                'type': 'severity',
-                'severity': 'warning',
-                'title': 'Severe Weather Alert',
-                'message': f'High weather severity index: {severity:.0f}/100',
-                'icon': '⚠️'
-            })
+        for key, compare, threshold, message_format, template in self._rules:
+            value = weather_data[key]
+            if compare(value, threshold):
+                # The message is only formatted if display_alerts renders it
+                new_alerts.append({**template, 'message_format': message_format, 'value': value})
         
         # Update active alerts
+        alerts_changed = new_alerts != self.active_alerts
         self.active_alerts = new_alerts
         
-        # Display alerts in UI
-        if new_alerts:
-            self.display_alerts()
+        # Display alerts in UI only when they differ from what was last shown,
+        # and take the reused window down once conditions clear
+        if alerts_changed:
+            if new_alerts:
+                self.display_alerts()
+            else:
+                self.hide_alerts()
         
         return new_alerts
     
+    def on_weather_update(self, weather_data):
+        """Post-update hook: check new data for alerts and report them in the status bar."""
+        alerts = self.check_weather_alerts(weather_data)
+        if alerts:
+            self.app.update_status(ALERT_STATUS_TEXT[len(alerts)])
+    
     def display_alerts(self):
         """Display active alerts in the UI."""
         if not self.active_alerts:
             return
         
-        # Create alerts window
+        alerts_window = self._ensure_alerts_window()
+        
+        # Hide the window while rows change so geometry is resolved once for the batch
+        alerts_window.withdraw()
+        
+        # Fill one pooled row per alert and hide the rest
+        for (alert_frame, message_label, severity_label), alert in zip(self._alert_rows, self.active_alerts):
+            alert_frame.configure(text=f"{alert['icon']} {alert['title']}")
+            message_label.configure(text=alert['message_format'] % alert['value'])
+            severity_label.configure(text=alert['severity_text'])
+            alert_frame.grid()
+        
+        for alert_frame, _, _ in self._alert_rows[len(self.active_alerts):]:
+            alert_frame.grid_remove()
+        
+        alerts_window.update_idletasks()
+        alerts_window.deiconify()
+        alerts_window.lift()
+    
+    def hide_alerts(self):
+        """Empty and hide the alerts window, if it has been built."""
+        if self._alerts_window is None or not self._alerts_window.winfo_exists():
+            return
+        
+        for alert_frame, _, _ in self._alert_rows:
+            alert_frame.grid_remove()
+        self._alerts_window.withdraw()
+    
+    def _ensure_alerts_window(self):
+        """Build the alerts window and its pool of alert rows once, hidden."""
+        if self._alerts_window is not None and self._alerts_window.winfo_exists():
+            return self._alerts_window
+        
+        # Create alerts window; closing it only hides it for reuse
         alerts_window = tk.Toplevel(self.app.root)
         alerts_window.title("Weather Alerts")
         alerts_window.geometry("400x300")
         alerts_window.transient(self.app.root)
+        alerts_window.protocol("WM_DELETE_WINDOW", alerts_window.withdraw)
+        alerts_window.withdraw()
         
         # Create alerts list
         main_frame = ttk.Frame(alerts_window, padding="10")
@@ -111,43 +169,71 @@ class WeatherAlertsManager:
         scrollbar = ttk.Scrollbar(main_frame, orient="vertical", command=canvas.yview)
         scrollable_frame = ttk.Frame(canvas)
         
-        scrollable_frame.bind(
-            "<Configure>",
-            lambda e: canvas.configure(scrollregion=canvas.bbox("all"))
-        )
+        # Debounce resizes: recompute the scroll region once per 50 ms burst of events
+        pending_update = None
+        
+        def update_scrollregion():
+            nonlocal pending_update
+            pending_update = None
+            canvas.configure(scrollregion=canvas.bbox("all"))
+        
+        def on_configure(event):
+            nonlocal pending_update
+            if pending_update is not None:
+                alerts_window.after_cancel(pending_update)
+            pending_update = alerts_window.after(50, update_scrollregion)
+        
+        scrollable_frame.bind("<Configure>", on_configure)
         
         canvas.create_window((0, 0), window=scrollable_frame, anchor="nw")
         canvas.configure(yscrollcommand=scrollbar.set)
         
-        for i, alert in enumerate(self.active_alerts):
-            alert_frame = ttk.LabelFrame(scrollable_frame, text=f"{alert['icon']} {alert['title']}", padding="5")
-            alert_frame.pack(fill=tk.X, pady=5)
-            
-            ttk.Label(alert_frame, text=alert['message']).pack(anchor=tk.W)
-            
-            severity_colors = {
-                'warning': 'red',
-                'caution': 'orange',
-                'watch': 'yellow'
-            }
-            
-            severity_label = ttk.Label(alert_frame, text=f"Severity: {alert['severity'].upper()}")
+        # Each rule fires at most once, so one row per rule is always enough.
+        # Rows are gridded in order once and shown or hidden with grid()/grid_remove().
+        self._alert_rows = []
+        for row in range(len(ALERT_RULES)):
+            alert_frame = ttk.LabelFrame(scrollable_frame, padding="5")
+            alert_frame.grid(row=row, column=0, sticky=(tk.W, tk.E), pady=5)
+            alert_frame.grid_remove()
+            message_label = ttk.Label(alert_frame)
+            message_label.pack(anchor=tk.W)
+            severity_label = ttk.Label(alert_frame)
             severity_label.pack(anchor=tk.W)
+            self._alert_rows.append((alert_frame, message_label, severity_label))
         
         canvas.pack(side="left", fill="both", expand=True)
         scrollbar.pack(side="right", fill="y")
         
         # Close button
-        ttk.Button(main_frame, text="Close", command=alerts_window.destroy).pack(pady=10)
+        ttk.Button(main_frame, text="Close", command=alerts_window.withdraw).pack(pady=10)
+        
+        self._alerts_window = alerts_window
+        return alerts_window
 
 class DataExportManager:
     """Handle data export functionality."""
     
     def __init__(self, app):
         self.app = app
+        
+        # Persistent connection for exports, used from the export worker thread.
+        # The file's journal mode is left to WeatherApp, which enables WAL so a
+        # long export reads without blocking the collector's writes.
+        self._conn = sqlite3.connect(app.database_path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA cache_size=-65536")
+        self._conn.execute("PRAGMA mmap_size=268435456")
+        self._export_lock = threading.Lock()
+        
+        # The app's per-city time index also makes each export page a range seek
+        if app.has_weather_schema():
+            app.create_indexes()
     
     def export_current_data(self, filename=None):
         """Export current weather data to CSV."""
+        if not self.app.current_city:
+            messagebox.showerror("Export Error", "No city selected")
+            return False
+        
         if not filename:
             from tkinter import filedialog
             filename = filedialog.asksaveasfilename(
@@ -159,32 +245,58 @@ class DataExportManager:
         if not filename:
             return False
         
+        # Query and write on a worker thread so the UI stays responsive
+        self.app.update_status("Exporting data...")
+        city, country = self.app.current_city_parts
+        threading.Thread(target=self._run_export, args=(filename, city, country), daemon=True).start()
+        return True
+    
+    def _run_export(self, filename, city, country):
+        """Write the export file. Runs on a worker thread, so Tk calls go through root.after."""
         try:
-            # Get data for current city
-            city_parts = self.app.current_city.split(', ')
-            city, country = city_parts[0], city_parts[1] if len(city_parts) > 1 else ''
-            
             # Export last 30 days of data
             end_time = datetime.now()
             start_time = end_time - timedelta(days=30)
+            since = start_time.strftime(self.app.TIMESTAMP_FORMAT)
             
-            conn = sqlite3.connect(self.app.database_path)
-            df = pd.read_sql_query("""
-                SELECT * FROM processed_weather_data
-                WHERE city = ? AND country = ?
-                AND datetime(timestamp) > datetime(?)
-                ORDER BY timestamp
-            """, conn, params=(city, country, start_time.isoformat()))
-            conn.close()
-            
-            df.to_csv(filename, index=False)
+            # One export at a time on the shared connection
+            with self._export_lock:
+                # Stream batches to a 1 MiB-buffered file instead of building a DataFrame
+                with open(filename, 'w', newline='', encoding='utf-8', buffering=1 << 20) as f:
+                    writer = csv.writer(f)
+                    for batch in self._iter_export_batches(city, country, since):
+                        writer.writerows(batch)
             
-            messagebox.showinfo("Export Complete", f"Data exported to {filename}")
-            return True
+            self.app.root.after(0, messagebox.showinfo, "Export Complete", f"Data exported to {filename}")
+            self.app.root.after(0, self.app.update_status, "Export complete")
             
         except Exception as e:
-            messagebox.showerror("Export Error", f"Failed to export data: {e}")
-            return False
+            self.app.root.after(0, messagebox.showerror, "Export Error", f"Failed to export data: {e}")
+            self.app.root.after(0, self.app.update_status, "Export failed")
+
+    def _iter_export_batches(self, city, country, start_timestamp):
+        """Yield the header row as a one-row batch, then pages of export rows."""
+        # A NULL rowid makes the first page's bound compare like timestamp > start_timestamp
+        last_key = (start_timestamp, None)
+        columns = None
+        
+        # Keyset pagination: each page is an index range scan that resumes
+        # after the previous page, so no read lock is held between pages
+        while True:
+            cursor = self._conn.execute(EXPORT_QUERY, (city, country, *last_key, EXPORT_PAGE_SIZE))
+            rows = cursor.fetchall()
+            
+            if columns is None:
+                # Column 0 is the rowid paging key, which is not exported
+                columns = [description[0] for description in cursor.description[1:]]
+                timestamp_index = columns.index('timestamp') + 1
+                yield [columns]
+            
+            if rows:
+                yield [row[1:] for row in rows]
+            if len(rows) < EXPORT_PAGE_SIZE:
+                return
+            last_key = (rows[-1][timestamp_index], rows[-1][0])
 
 # Integration with main app
 def enhance_main_app(self):
@@ -196,17 +308,8 @@ def enhance_main_app(self):
     # Add export manager
     self.export_manager = DataExportManager(self)
     
-    # Add alerts check to data update process
-    original_update = self._update_ui_with_data
-    
-    def enhanced_update(data):
-        original_update(data)
-        # Check for alerts after updating UI
-        alerts = self.alerts_manager.check_weather_alerts(data)
-        if alerts:
-            self.update_status(f"⚠️ {len(alerts)} weather alert(s) active")
-    
-    self._update_ui_with_data = enhanced_update
+    # Check for alerts after each UI update
+    self._post_update_hooks.append(self.alerts_manager.on_weather_update)
     
     # Add export option to menu
     self.create_enhanced_menu()
@@ -276,6 +379,7 @@ def run_integration_tests(self):
     
     # Test 3: Chart rendering
     try:
+        # Both fetches share the app's connection and its lock, so run them in turn
         self.update_trends_chart()
         self.update_historical_chart()
         test_results.append(("Chart Rendering", "PASS", "Charts rendered successfully"))